@@ -0,0 +1,125 @@
+"""Load generator for the Student Microservice HTTP API.
+
+Opens a number of keep-alive connections, sends a mix of lookups, listings and adds
+as fast as the server answers, then reports requests/sec and latency percentiles.
+
+    python student_load_test.py --spawn                    # start a server in this process
+    python student_load_test.py --port 8080 --connections 32 --requests 50000
+
+With --spawn the server shares this process (and its GIL) with the clients, so the
+numbers are lower than against a server started on its own.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import math
+import random
+import threading
+import time
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_client(host, port, counter, total, mix, known_ids, latencies, statuses, seed):
+    """One keep-alive connection sending requests until the shared counter reaches `total`"""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    write_ratio, list_ratio = mix
+    headers = {"Content-Type": "application/json"}
+    
+    for n in counter:
+        if n >= total:
+            break
+        roll = rng.random()
+        if roll < write_ratio:
+            student_id = f"LT{n}"
+            body = json.dumps({"id": student_id, "name": f"Load Test {n}", "course": "Benchmarking"})
+            request = ("POST", "/students", body, headers)
+        elif roll < write_ratio + list_ratio:
+            request = ("GET", "/students", None, {})
+        else:
+            request = ("GET", f"/students/{rng.choice(known_ids)}", None, {})
+        
+        start = time.perf_counter()
+        try:
+            conn.request(*request)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            conn.close()  # Reconnects on the next request
+            status = "error"
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 201:
+            known_ids.append(student_id)
+    conn.close()
+
+
+def run_load_test(host, port, connections=16, requests=20_000, write_ratio=0.1, list_ratio=0.01):
+    """Drive the API from `connections` threads and print throughput and latency"""
+    counter = itertools.count()  # Shared - next() on it is atomic
+    known_ids = ["ST100", "ST101"]
+    per_client = [([], {}) for _ in range(connections)]
+    threads = [threading.Thread(target=run_client,
+                                args=(host, port, counter, requests, (write_ratio, list_ratio),
+                                      known_ids, latencies, statuses, i))
+               for i, (latencies, statuses) in enumerate(per_client)]
+    
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(l for client_latencies, _ in per_client for l in client_latencies)
+    statuses = {}
+    for _, client_statuses in per_client:
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    
+    print(f"Requests: {len(latencies):,} in {elapsed:.2f}s over {connections} connections "
+          f"-> {len(latencies) / elapsed:,.0f} req/s")
+    print("Status codes: " + "  ".join(f"{status}: {count:,}" for status, count in sorted(statuses.items(), key=str)))
+    print("Latency ms: " + "  ".join(f"p{pct} {percentile(latencies, pct) * 1000:.2f}" for pct in (50, 90, 99))
+          + f"  max {latencies[-1] * 1000:.2f}" if latencies else "")
+    return {"rps": len(latencies) / elapsed, "statuses": statuses,
+            "p50": percentile(latencies, 50), "p90": percentile(latencies, 90), "p99": percentile(latencies, 99)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Student Microservice HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=16, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=20_000, help="total requests to send")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="share of requests that add a student")
+    parser.add_argument("--list-ratio", type=float, default=0.01, help="share of requests that list every student")
+    parser.add_argument("--spawn", action="store_true", help="start a server in this process on a free port")
+    parser.add_argument("--workers", type=int, default=16, help="server worker threads (with --spawn)")
+    args = parser.parse_args()
+    
+    server = None
+    if args.spawn:
+        from sensor_assignment import StudentMicroservice, start_student_server
+        service = StudentMicroservice(verbose=False)
+        logging.getLogger().setLevel(logging.WARNING)  # A log line per request would dominate the timing
+        service.add_student("ST100", "Michael Smith", "Data Science")
+        service.add_student("ST101", "Emma Johnson", "Cyber security")
+        server = start_student_server(service, args.host, 0, workers=args.workers)
+        args.port = server.server_address[1]
+    try:
+        run_load_test(args.host, args.port, args.connections, args.requests, args.write_ratio, args.list_ratio)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()